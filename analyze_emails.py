@@ -1,60 +1,200 @@
-import json
 import os
-from collections import Counter, defaultdict
+import sys
+import multiprocessing
+from collections import Counter, namedtuple
 from datetime import datetime, timedelta
 import re
-from email_processor import EmailProcessor
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from email_processor import EmailProcessor, build_term_finder
+from json_io import load_json
 from urllib.parse import urlparse
 
+# Mailboxes smaller than this are analyzed in-process; below it the cost of
+# starting workers and pickling emails outweighs the parallel speedup
+PARALLEL_MIN_EMAILS = 5000
+
+_DOMAIN_RE = re.compile(r'@([\w.-]+)')
+_WORD_RE = re.compile(r'\b\w+\b')
+# Address inside the trailing angle brackets of a From header
+_ADDR_RE = re.compile(r'<([^<>]*)>?\s*$')
+
+# Common newsletter indicators
+NEWSLETTER_INDICATORS = [
+    'newsletter', 'digest', 'weekly', 'monthly', 'daily', 'subscription',
+    'subscribe', 'unsubscribe', 'opt-out', 'opt out'
+]
+_NEWSLETTER_RE = re.compile(
+    '|'.join(re.escape(term) for term in NEWSLETTER_INDICATORS),
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=131072)
+def _parse_dt(date_str):
+    """Parse an ISO date string, caching results since many emails share timestamps"""
+    if date_str.endswith('Z'):
+        return datetime.fromisoformat(date_str[:-1] + '+00:00')
+    return datetime.fromisoformat(date_str)
+
+def _parse_email_date(date_str):
+    """Parse an email's ISO date, or return None if it is missing or invalid"""
+    if not date_str:
+        return None
+    try:
+        return _parse_dt(date_str)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+# Flat projection of the email fields used by the analysis, so the hot loops
+# read attributes instead of repeating dict.get() lookups with defaults
+EmailRow = namedtuple(
+    'EmailRow',
+    'message_id in_reply_to references sender subject importance date attachment_count body'
+)
+
+def _intern(value):
+    """Intern strings that repeat across emails and are used as dict keys"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _project_email(email):
+    """Project an email dict onto an EmailRow"""
+    return EmailRow(
+        _intern(email.get('message_id', '')),
+        _intern(email.get('in_reply_to', '')),
+        email.get('references', ''),
+        _intern(email.get('from', '')),
+        email.get('subject', ''),
+        email.get('importance_score', 0),
+        email.get('date', ''),
+        len(email.get('attachments', [])),
+        email.get('body', '')
+    )
+
+def _load_emails(json_file):
+    """Load the email list from a JSON file"""
+    return load_json(json_file, 'emails')
+
+def _is_from_contact(sender, contact_emails):
+    """Check whether the address in a From header is a known contact"""
+    if not contact_emails or not sender:
+        return False
+    match = _ADDR_RE.search(sender)
+    sender_email = match.group(1) if match else sender.strip()
+    return sender_email in contact_emails
+
+def _count_text_stats(emails, blacklist, contact_emails):
+    """Count sender, subject, contact and blacklist statistics for a list of emails"""
+    senders = [email.sender for email in emails if email.sender]
+    subjects = [email.subject for email in emails if email.subject]
+    
+    # Count senders, domains, subjects and words in bulk
+    sender_counter = Counter(senders)
+    domain_counter = Counter(match.group(1) for match in map(_DOMAIN_RE.search, senders) if match)
+    subject_counter = Counter(subjects)
+    word_counter = Counter(word.lower() for subject in subjects for word in _WORD_RE.findall(subject))
+    
+    # Check for newsletter indicators in subject
+    newsletter_counter = Counter(subject for subject in subjects if _NEWSLETTER_RE.search(subject))
+    
+    # Check if sender is in contacts
+    contact_stats = Counter(
+        'from_contacts' if _is_from_contact(email.sender, contact_emails) else 'from_non_contacts'
+        for email in emails
+    )
+    
+    # Check for blacklist terms, skipping the lowered subject+body copy
+    # entirely when there is nothing to look for
+    blacklist_terms = Counter()
+    if blacklist:
+        find_blacklist_terms = build_term_finder(blacklist)
+        blacklist_terms.update(
+            term
+            for email in emails
+            for term in find_blacklist_terms(f"{email.subject} {email.body}".lower())
+        )
+    
+    return {
+        'senders': sender_counter,
+        'domains': domain_counter,
+        'subjects': subject_counter,
+        'words': word_counter,
+        'newsletters': newsletter_counter,
+        'contacts': contact_stats,
+        'blacklist_terms': blacklist_terms
+    }
+
+def _count_text_stats_parallel(emails, blacklist, contact_emails):
+    """Split text statistics across worker processes and sum the partial counters"""
+    processes = os.cpu_count() or 1
+    if processes < 2 or len(emails) < PARALLEL_MIN_EMAILS:
+        return _count_text_stats(emails, blacklist, contact_emails)
+    
+    # Contiguous chunks keep first-seen order, so ties in most_common() still
+    # break the same way as a sequential pass
+    chunk_size = -(-len(emails) // processes)
+    chunks = [emails[i:i + chunk_size] for i in range(0, len(emails), chunk_size)]
+    with multiprocessing.Pool(processes) as pool:
+        partials = pool.starmap(
+            _count_text_stats,
+            [(chunk, blacklist, contact_emails) for chunk in chunks]
+        )
+    
+    totals = partials[0]
+    for partial in partials[1:]:
+        for name, counter in partial.items():
+            totals[name].update(counter)
+    return totals
+
 def analyze_emails(json_file):
     print(f"\nAnalyzing {json_file}...")
     
-    # Initialize processor with verbose mode to load contacts
-    processor = EmailProcessor(verbose=True)
-    
-    # Load the JSON file
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        emails = data.get('emails', [])
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Read the JSON file in the background while contacts, blacklist and
+        # scoring config are loaded, so the two sets of disk reads overlap
+        loaded_emails = executor.submit(_load_emails, json_file)
+        
+        # Initialize processor with verbose mode to load contacts
+        processor = EmailProcessor(verbose=True)
+        
+        emails = [_project_email(email) for email in loaded_emails.result()]
     
     if not emails:
         print("No emails found in the file.")
         return
     
     # Initialize counters
-    sender_counter = Counter()
-    subject_counter = Counter()
-    newsletter_counter = Counter()
-    importance_distribution = Counter()
-    time_distribution = Counter()
-    attachment_stats = Counter()
     reply_stats = Counter()
-    contact_stats = Counter()
-    domain_counter = Counter()
-    word_counter = Counter()
-    blacklist_terms = Counter()
     
-    # For reply time analysis
-    thread_times = []
-    thread_emails = defaultdict(list)
-    thread_sizes = Counter()  # Track how many emails are in each thread
-    thread_reply_counts = Counter()  # Track how many times you replied in each thread
+    # For reply time analysis, stored as packed int64 microseconds rather
+    # than a list of timedelta objects
+    thread_times = array('q')
     
-    # Common newsletter indicators
-    newsletter_indicators = [
-        'newsletter', 'digest', 'weekly', 'monthly', 'daily', 'subscription',
-        'subscribe', 'unsubscribe', 'opt-out', 'opt out'
-    ]
+    # Index email positions by message ID and collect every ID that was
+    # replied to, so reply lookups below are O(1) instead of rescanning all emails
+    id_index = {}
+    replied_ids = set()
+    thread_meta = []
     
-    # Load blacklist terms
-    blacklist = processor.blacklist
+    # Bind the methods called once per email as locals for the loop below
+    index_message = id_index.setdefault
+    add_replied_id = replied_ids.add
+    add_replied_ids = replied_ids.update
+    add_thread_meta = thread_meta.append
+    intern = sys.intern
     
     # First pass: organize emails into threads
-    for email in emails:
-        message_id = email.get('message_id', '')
-        in_reply_to = email.get('in_reply_to', '')
-        references = email.get('references', '')
-        references_list = references.split() if references else []
+    for position, email in enumerate(emails):
+        message_id = email.message_id
+        in_reply_to = email.in_reply_to
+        references = email.references
+        references_list = list(map(intern, references.split())) if references else []
+        
+        if message_id:
+            index_message(message_id, position)
+        if in_reply_to:
+            add_replied_id(in_reply_to)
+        add_replied_ids(references_list)
         
         # Determine thread root
         thread_root = None
@@ -64,233 +204,186 @@ def analyze_emails(json_file):
             thread_root = references_list[0]
         else:
             thread_root = message_id
-            
-        thread_emails[thread_root].append(email)
-        thread_sizes[thread_root] += 1
-        
-        # If this is a reply, increment the reply count for this thread
-        if in_reply_to or references_list:
-            thread_reply_counts[thread_root] += 1
-    
-    # Process each email
-    for email in emails:
-        # Count senders and domains
-        sender = email.get('from', '')
-        if sender:
-            sender_counter[sender] += 1
-            # Extract domain from email
-            match = re.search(r'@([\w.-]+)', sender)
-            if match:
-                domain_counter[match.group(1)] += 1
-        
-        # Count subjects and words
-        subject = email.get('subject', '')
-        if subject:
-            subject_counter[subject] += 1
-            # Count words in subject
-            words = re.findall(r'\b\w+\b', subject.lower())
-            word_counter.update(words)
-            
-            # Check for newsletter indicators in subject
-            subject_lower = subject.lower()
-            if any(indicator in subject_lower for indicator in newsletter_indicators):
-                newsletter_counter[subject] += 1
-        
-        # Count importance scores
-        importance = email.get('importance_score', 0)
-        importance_distribution[importance] += 1
-        
-        # Count time distribution (by hour)
-        try:
-            date_str = email.get('date', '')
-            if date_str:
-                date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                time_distribution[date_obj.hour] += 1
-        except (ValueError, TypeError):
-            pass
-        
-        # Count attachments
-        attachments = email.get('attachments', [])
-        attachment_stats[len(attachments)] += 1
         
+        # For a reply the thread root is also the email it answers, and for
+        # anything else it is the email's own ID, so the reply pass below is
+        # resolved from this metadata alone without touching the emails again
+        is_reply = bool(in_reply_to or references_list)
+        add_thread_meta((thread_root, is_reply))
+    
+    # Track how many emails are in each thread
+    thread_sizes = Counter(thread_root for thread_root, _ in thread_meta)
+    # Track how many times you replied in each thread
+    thread_reply_counts = Counter(thread_root for thread_root, is_reply in thread_meta if is_reply)
+    
+    # Sender, subject, contact and blacklist statistics only depend on each
+    # email itself, so they are counted separately (in parallel when large)
+    contact_emails = frozenset(processor.contacts['emails']) if processor.contacts else frozenset()
+    text_stats = _count_text_stats_parallel(emails, processor.blacklist, contact_emails)
+    sender_counter = text_stats['senders']
+    domain_counter = text_stats['domains']
+    subject_counter = text_stats['subjects']
+    word_counter = text_stats['words']
+    newsletter_counter = text_stats['newsletters']
+    contact_stats = text_stats['contacts']
+    blacklist_terms = text_stats['blacklist_terms']
+    
+    # Numeric columns are projected out once and counted in bulk
+    importance_distribution = Counter(email.importance for email in emails)
+    attachment_stats = Counter(email.attachment_count for email in emails)
+    
+    # Parse each email's date once; the hour histogram and reply times share it
+    parsed_dates = [_parse_email_date(email.date) for email in emails]
+    time_distribution = Counter(date.hour for date in parsed_dates if date is not None)
+    
+    # Resolve reply statistics now that every message ID has been indexed
+    for position, (thread_root, is_reply) in enumerate(thread_meta):
         # Count replies and analyze reply times
-        is_reply = email.get('is_reply', False)
-        in_reply_to = email.get('in_reply_to', '')
-        references = email.get('references', '')
-        references_list = references.split() if references else []
-        
         # Consider an email a reply if it has in_reply_to or references
-        if in_reply_to or references_list:
+        if is_reply:
             reply_stats['replies'] += 1
             
-            # Try to find the original email in the thread
-            original_message_id = in_reply_to if in_reply_to else references_list[0]
-            try:
-                # Find the original email in the thread
-                original_email = next((e for e in emails if e.get('message_id') == original_message_id), None)
-                if original_email:
+            # Find the original email in the thread
+            original_position = id_index.get(thread_root)
+            if original_position is not None:
+                original_date = parsed_dates[original_position]
+                reply_date = parsed_dates[position]
+                if original_date is not None and reply_date is not None:
                     try:
-                        original_date = datetime.fromisoformat(original_email['date'].replace('Z', '+00:00'))
-                        reply_date = datetime.fromisoformat(email['date'].replace('Z', '+00:00'))
                         reply_time = reply_date - original_date
                         if reply_time > timedelta(0):  # Only count positive reply times
-                            thread_times.append(reply_time)
-                    except (ValueError, TypeError):
+                            thread_times.append(reply_time // timedelta(microseconds=1))
+                    except TypeError:
+                        # Naive and aware datetimes can't be compared
                         pass
-            except Exception:
-                pass
         else:
             # Check if this email was replied to
-            message_id = email.get('message_id', '')
-            was_replied_to = any(
-                e.get('in_reply_to') == message_id or 
-                (e.get('references', '') and message_id in e.get('references', '').split())
-                for e in emails
-            )
-            if was_replied_to:
+            if thread_root in replied_ids:
                 reply_stats['replied_to'] += 1
             else:
                 reply_stats['not_replied_to'] += 1
-        
-        # Check if sender is in contacts
-        is_from_contact = False
-        if processor.contacts:
-            try:
-                from_parts = sender.split('<')
-                if len(from_parts) > 1:
-                    sender_email = from_parts[-1].strip('>')
-                else:
-                    sender_email = sender.strip()
-                is_from_contact = sender_email in processor.contacts['emails']
-            except Exception:
-                pass
-        
-        if is_from_contact:
-            contact_stats['from_contacts'] += 1
-        else:
-            contact_stats['from_non_contacts'] += 1
-            
-        # Check for blacklist terms
-        text_to_check = f"{subject} {email.get('body', '')}".lower()
-        for term in blacklist:
-            if term in text_to_check:
-                blacklist_terms[term] += 1
     
-    # Print statistics
-    print(f"\nTotal Emails: {len(emails)}")
+    # Print statistics, collected into one write instead of a print per line
+    out = []
+    out.append(f"\nTotal Emails: {len(emails)}")
     
-    print("\nTop 10 Senders:")
+    out.append("\nTop 10 Senders:")
     for sender, count in sender_counter.most_common(10):
-        print(f"- {sender}: {count} emails")
+        out.append(f"- {sender}: {count} emails")
     
-    print("\nTop 10 Email Domains:")
+    out.append("\nTop 10 Email Domains:")
     for domain, count in domain_counter.most_common(10):
-        print(f"- {domain}: {count} emails")
+        out.append(f"- {domain}: {count} emails")
     
-    print("\nTop 10 Subjects:")
+    out.append("\nTop 10 Subjects:")
     for subject, count in subject_counter.most_common(10):
-        print(f"- {subject}: {count} emails")
+        out.append(f"- {subject}: {count} emails")
     
-    print("\nTop 10 Most Common Words in Subjects:")
+    out.append("\nTop 10 Most Common Words in Subjects:")
     for word, count in word_counter.most_common(10):
-        print(f"- {word}: {count} occurrences")
+        out.append(f"- {word}: {count} occurrences")
     
-    print("\nTop 10 Newsletters:")
+    out.append("\nTop 10 Newsletters:")
     for subject, count in newsletter_counter.most_common(10):
-        print(f"- {subject}: {count} emails")
+        out.append(f"- {subject}: {count} emails")
     
-    print("\nImportance Score Distribution:")
+    out.append("\nImportance Score Distribution:")
     for score, count in sorted(importance_distribution.items()):
         percentage = (count / len(emails)) * 100
-        print(f"- Score {score}: {count} emails ({percentage:.1f}%)")
+        out.append(f"- Score {score}: {count} emails ({percentage:.1f}%)")
     
     if time_distribution:
-        print("\nTime Distribution (by hour):")
+        out.append("\nTime Distribution (by hour):")
         for hour in range(24):
             count = time_distribution[hour]
             percentage = (count / len(emails)) * 100
-            print(f"- {hour:02d}:00: {count} emails ({percentage:.1f}%)")
+            out.append(f"- {hour:02d}:00: {count} emails ({percentage:.1f}%)")
         
         # Busiest hour
-        busiest_hour = max(time_distribution.items(), key=lambda x: x[1])
-        print(f"\nBusiest Hour: {busiest_hour[0]:02d}:00 with {busiest_hour[1]} emails")
+        busiest_hour = time_distribution.most_common(1)[0]
+        out.append(f"\nBusiest Hour: {busiest_hour[0]:02d}:00 with {busiest_hour[1]} emails")
     
-    print("\nAttachment Statistics:")
+    out.append("\nAttachment Statistics:")
     for count, emails_count in sorted(attachment_stats.items()):
         percentage = (emails_count / len(emails)) * 100
-        print(f"- {count} attachments: {emails_count} emails ({percentage:.1f}%)")
+        out.append(f"- {count} attachments: {emails_count} emails ({percentage:.1f}%)")
     
-    print("\nReply Statistics:")
+    out.append("\nReply Statistics:")
     for type_, count in reply_stats.items():
         percentage = (count / len(emails)) * 100
-        print(f"- {type_}: {count} emails ({percentage:.1f}%)")
+        out.append(f"- {type_}: {count} emails ({percentage:.1f}%)")
     
     # Add detailed thread statistics
-    print("\nThread Statistics:")
+    out.append("\nThread Statistics:")
     total_threads = len(thread_sizes)
-    print(f"- Total number of threads: {total_threads}")
+    out.append(f"- Total number of threads: {total_threads}")
     
     # Thread size distribution
-    print("\nThread Size Distribution:")
-    size_distribution = Counter()
-    for thread_root, size in thread_sizes.items():
-        size_distribution[size] += 1
+    out.append("\nThread Size Distribution:")
+    size_distribution = Counter(thread_sizes.values())
     
     for size, count in sorted(size_distribution.items()):
         percentage = (count / total_threads) * 100
-        print(f"- {size} emails in thread: {count} threads ({percentage:.1f}%)")
+        out.append(f"- {size} emails in thread: {count} threads ({percentage:.1f}%)")
     
     # Your reply frequency in threads
-    print("\nYour Reply Frequency in Threads:")
-    reply_frequency = Counter()
-    for thread_root, reply_count in thread_reply_counts.items():
-        thread_size = thread_sizes[thread_root]
-        if thread_size > 1:  # Only count threads with multiple emails
-            reply_frequency[reply_count] += 1
+    out.append("\nYour Reply Frequency in Threads:")
+    reply_frequency = Counter(
+        reply_count
+        for thread_root, reply_count in thread_reply_counts.items()
+        if thread_sizes[thread_root] > 1  # Only count threads with multiple emails
+    )
     
     for reply_count, thread_count in sorted(reply_frequency.items()):
         percentage = (thread_count / total_threads) * 100
-        print(f"- {reply_count} replies in thread: {thread_count} threads ({percentage:.1f}%)")
+        out.append(f"- {reply_count} replies in thread: {thread_count} threads ({percentage:.1f}%)")
     
     # Calculate and display reply time statistics
     if thread_times:
-        avg_reply_time = sum(thread_times, timedelta(0)) / len(thread_times)
-        print("\nReply Time Statistics:")
-        print(f"- Average Reply Time: {avg_reply_time}")
-        print(f"- Fastest Reply: {min(thread_times)}")
-        print(f"- Slowest Reply: {max(thread_times)}")
-        print(f"- Total Threads Analyzed: {len(thread_times)}")
-    
-    print("\nContact Statistics:")
+        avg_reply_time = timedelta(microseconds=sum(thread_times)) / len(thread_times)
+        out.append("\nReply Time Statistics:")
+        out.append(f"- Average Reply Time: {avg_reply_time}")
+        out.append(f"- Fastest Reply: {timedelta(microseconds=min(thread_times))}")
+        out.append(f"- Slowest Reply: {timedelta(microseconds=max(thread_times))}")
+        out.append(f"- Total Threads Analyzed: {len(thread_times)}")
+    
+    out.append("\nContact Statistics:")
     for type_, count in contact_stats.items():
         percentage = (count / len(emails)) * 100
-        print(f"- {type_}: {count} emails ({percentage:.1f}%)")
+        out.append(f"- {type_}: {count} emails ({percentage:.1f}%)")
     
     if blacklist_terms:
-        print("\nTop 10 Blacklisted Terms Found:")
+        out.append("\nTop 10 Blacklisted Terms Found:")
         for term, count in blacklist_terms.most_common(10):
-            print(f"- {term}: {count} occurrences")
+            out.append(f"- {term}: {count} occurrences")
     
     # Additional analysis
-    print("\nAdditional Statistics:")
-    
-    # Average importance score
-    avg_importance = sum(score * count for score, count in importance_distribution.items()) / len(emails)
-    print(f"- Average Importance Score: {avg_importance:.2f}")
+    out.append("\nAdditional Statistics:")
+    
+    # Average importance score and importance categories in one pass over the distribution
+    importance_total = 0
+    high_importance = medium_importance = low_importance = 0
+    for score, count in importance_distribution.items():
+        importance_total += score * count
+        if score >= 5:
+            high_importance += count
+        elif score >= 0:
+            medium_importance += count
+        else:
+            low_importance += count
+    avg_importance = importance_total / len(emails)
+    out.append(f"- Average Importance Score: {avg_importance:.2f}")
     
     # Most common attachment count
-    most_common_attachments = max(attachment_stats.items(), key=lambda x: x[1])
-    print(f"- Most Common Attachment Count: {most_common_attachments[0]} ({most_common_attachments[1]} emails)")
-    
-    # Calculate percentages for importance categories
-    high_importance = sum(count for score, count in importance_distribution.items() if score >= 5)
-    medium_importance = sum(count for score, count in importance_distribution.items() if 0 <= score < 5)
-    low_importance = sum(count for score, count in importance_distribution.items() if score < 0)
-    
-    print("\nImportance Categories:")
-    print(f"- High Importance (score >= 5): {high_importance} emails ({(high_importance/len(emails))*100:.1f}%)")
-    print(f"- Medium Importance (0 <= score < 5): {medium_importance} emails ({(medium_importance/len(emails))*100:.1f}%)")
-    print(f"- Low Importance (score < 0): {low_importance} emails ({(low_importance/len(emails))*100:.1f}%)")
+    most_common_attachments = attachment_stats.most_common(1)[0]
+    out.append(f"- Most Common Attachment Count: {most_common_attachments[0]} ({most_common_attachments[1]} emails)")
+    
+    out.append("\nImportance Categories:")
+    out.append(f"- High Importance (score >= 5): {high_importance} emails ({(high_importance/len(emails))*100:.1f}%)")
+    out.append(f"- Medium Importance (0 <= score < 5): {medium_importance} emails ({(medium_importance/len(emails))*100:.1f}%)")
+    out.append(f"- Low Importance (score < 0): {low_importance} emails ({(low_importance/len(emails))*100:.1f}%)")
+    
+    sys.stdout.write('\n'.join(out) + '\n')
 
 def main():
     # Get all JSON files in the output directory
@@ -1,35 +1,43 @@
 import json
 import os
 from datetime import datetime
-import glob
 import email.utils
+from json_io import load_json
+
+# Required fields, in the order they are reported when missing
+CONTACTS_REQUIRED_FIELDS = ('emails', 'names', 'first_names', 'last_names', 'organizations')
+EMAIL_REQUIRED_FIELDS = ('subject', 'from', 'date', 'message_id', 'importance_score')
+_EMAIL_REQUIRED_SET = frozenset(EMAIL_REQUIRED_FIELDS)
 
 def parse_date(date_str):
-    """Parse date string in either RFC 2822 or ISO format"""
-    if not date_str:
+    """Parse date string in either ISO or RFC 2822 format"""
+    if not date_str or not isinstance(date_str, str):
         return None  # Return None for empty dates instead of raising error
     
+    # Stored dates are normally ISO, which always starts with the year, so
+    # try the cheaper ISO parser first and only fall back to RFC 2822
+    if date_str[:1].isdigit():
+        try:
+            if date_str.endswith('Z'):
+                return datetime.fromisoformat(date_str[:-1] + '+00:00')
+            return datetime.fromisoformat(date_str)
+        except ValueError:
+            pass
+    
     try:
-        # Try RFC 2822 format first
-        parsed_date = email.utils.parsedate_to_datetime(date_str)
-        return parsed_date
+        # Try RFC 2822 format
+        return email.utils.parsedate_to_datetime(date_str)
     except (TypeError, ValueError):
-        try:
-            # Try ISO format
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            return None  # Return None for invalid dates instead of raising error
+        return None  # Return None for invalid dates instead of raising error
 
 def check_json_file(file_path):
     """Check if a JSON file is valid and properly formatted"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(file_path)
         
         # Special handling for contacts.json
         if os.path.basename(file_path) == 'contacts.json':
-            required_fields = ['emails', 'names', 'first_names', 'last_names', 'organizations']
-            missing_fields = [field for field in required_fields if field not in data]
+            missing_fields = [field for field in CONTACTS_REQUIRED_FIELDS if field not in data]
             if missing_fields:
                 print(f"❌ Error: Missing required fields: {', '.join(missing_fields)}")
                 return False
@@ -56,10 +64,10 @@ def check_json_file(file_path):
         issues = []
         
         for i, email in enumerate(data['emails'], 1):
-            # Required fields
-            required_fields = ['subject', 'from', 'date', 'message_id', 'importance_score']
-            missing_fields = [field for field in required_fields if field not in email]
-            if missing_fields:
+            # Required fields, checked with one subset test against the keys;
+            # the ordered list is only built to report an invalid email
+            if not _EMAIL_REQUIRED_SET.issubset(email.keys()):
+                missing_fields = [field for field in EMAIL_REQUIRED_FIELDS if field not in email]
                 issues.append(f"Email {i}: Missing required fields: {', '.join(missing_fields)}")
                 continue
             
@@ -97,10 +105,18 @@ def check_json_file(file_path):
 def main():
     # Get all JSON files in the output directory
     output_dir = 'output'
-    json_files = glob.glob(os.path.join(output_dir, '*.json'))
+    contacts_files = []
+    email_files = []
+    if os.path.isdir(output_dir):
+        with os.scandir(output_dir) as entries:
+            for entry in entries:
+                if entry.name == 'contacts.json':
+                    contacts_files.append(entry.path)
+                elif entry.name.endswith('.json') and not entry.name.startswith('.'):
+                    email_files.append(entry.path)
     
-    # Sort files to process contacts.json first
-    json_files.sort(key=lambda x: os.path.basename(x) != 'contacts.json')
+    # Process contacts.json first
+    json_files = contacts_files + sorted(email_files)
     
     all_valid = True
     for file_path in json_files:
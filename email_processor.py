@@ -1,10 +1,13 @@
 import imaplib
 import email
 import json
+import sys
 import os
 import csv
 import argparse
 import re
+import multiprocessing
+import heapq
 from email.header import decode_header
 from datetime import datetime, timezone
 from dotenv import load_dotenv
@@ -12,7 +15,122 @@ from email_validator import validate_email, EmailNotValidError
 import html2text
 import quopri
 import base64
+from collections import Counter
+from contextlib import nullcontext
+from functools import lru_cache
 from email.utils import parsedate_to_datetime
+from json_io import load_json, save_json
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Number of messages requested per IMAP FETCH round trip
+FETCH_BATCH_SIZE = 200
+
+# Message count in an IMAP STATUS response, e.g. b'INBOX (MESSAGES 42)'
+_STATUS_MESSAGES_RE = re.compile(rb'MESSAGES (\d+)')
+
+# Below this many messages, parsing in worker processes costs more than it saves
+PARALLEL_MIN_EMAILS = 500
+
+# Patterns used by EmailProcessor._clean_text, compiled once
+_MULTI_SPACE_RE = re.compile(r' {2,}')
+_MD_IMAGE_RE = re.compile(r'!\[.*?\]\(.*?\)')
+_MD_LINK_RE = re.compile(r'\[(.*?)\]\(.*?\)')
+_HRULE_RE = re.compile(r'-{3,}')
+_MULTI_DASH_RE = re.compile(r'-{2,}')
+_MD_EMPHASIS_RE = re.compile(r'[*_]{1,2}(.*?)[*_]{1,2}')
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+def build_term_finder(terms):
+    """Build a function returning the terms in a text, once per listing and in listed order"""
+    multiplicity = Counter(terms)
+    unique_terms = sorted((term for term in multiplicity if term), key=len, reverse=True)
+    # An empty term is contained in every text, like `'' in text`
+    always = [''] * multiplicity[''] if '' in multiplicity else []
+    if not unique_terms:
+        return lambda text: list(always)
+    
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for term in unique_terms:
+            automaton.add_word(term, term)
+        automaton.make_automaton()
+        
+        def scan(text):
+            return {term for _, term in automaton.iter(text)}
+    else:
+        # One lookahead alternation, longest first, scans the text once;
+        # shorter terms starting at the same position are substrings of the
+        # match there, so they come from the contained table
+        contained = {term: {other for other in unique_terms if other in term} for term in unique_terms}
+        pattern = re.compile('(?=(' + '|'.join(re.escape(term) for term in unique_terms) + '))')
+        
+        def scan(text):
+            found = set()
+            for match in set(pattern.findall(text)):
+                found |= contained[match]
+            return found
+    
+    order = {term: index for index, term in enumerate(multiplicity)}
+    
+    def find(text):
+        found = sorted(scan(text), key=order.__getitem__)
+        return always + [term for term in found for _ in range(multiplicity[term])]
+    
+    return find
+
+@lru_cache(maxsize=65536)
+def _parse_date_string(date_str):
+    """Parse an ISO 8601 or RFC 2822 date string, or return None if no known format matches.
+
+    Cached because every incremental save re-reads the dates of all stored
+    emails.
+    """
+    # Dates stored by _parse_email are ISO 8601, which fromisoformat parses in C
+    if date_str[4:5] == '-':
+        try:
+            return datetime.fromisoformat(date_str)
+        except ValueError:
+            pass
+    try:
+        return parsedate_to_datetime(date_str)
+    except (TypeError, ValueError):
+        pass
+    for fmt in ('%a, %d %b %Y %H:%M:%S %z', '%a, %d %b %Y %H:%M:%S %Z'):
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+@lru_cache(maxsize=8192)
+def _decode_encoded_words(header):
+    """Decode RFC 2047 encoded words in a header; cached as senders repeat"""
+    header_parts = []
+    for content, charset in decode_header(header):
+        if isinstance(content, bytes):
+            if charset:
+                header_parts.append(content.decode(charset))
+            else:
+                header_parts.append(content.decode('utf-8', errors='replace'))
+        else:
+            header_parts.append(content)
+    return ' '.join(header_parts)
+
+# EmailProcessor copy used by pool tasks, set once per worker process by init_worker
+worker_processor = None
+
+def init_worker(processor):
+    """Pool initializer: keep the pickled processor for the worker's lifetime"""
+    global worker_processor
+    worker_processor = processor
+
+def _parse_raw_email_worker(item):
+    """Pool task: parse one (index, raw bytes) pair in a worker process"""
+    return worker_processor._parse_raw_email(item)
 
 class EmailProcessor:
     def __init__(self, verbose=False, load_contacts=True):
@@ -23,6 +141,7 @@ class EmailProcessor:
         self.email_password = os.getenv('EMAIL_PASSWORD')
         self.verbose = verbose
         self.contacts = None
+        self._mail = None
         self.html_converter = html2text.HTML2Text()
         self.html_converter.ignore_links = False
         self.html_converter.ignore_images = True
@@ -30,9 +149,9 @@ class EmailProcessor:
         # Load blacklist
         try:
             with open('blacklist.txt', 'r', encoding='utf-8') as f:
-                self.blacklist = [line.strip().lower() for line in f if line.strip()]
+                self.blacklist = tuple(sys.intern(line.strip().lower()) for line in f if line.strip())
         except FileNotFoundError:
-            self.blacklist = []
+            self.blacklist = ()
             if self.verbose:
                 print("No blacklist.txt file found. Using empty blacklist.")
         
@@ -48,6 +167,8 @@ class EmailProcessor:
         if load_contacts:
             self._load_contacts()
         
+        self._prepare_scoring()
+        
         # Create output directory if it doesn't exist
         self.output_dir = os.path.join(os.path.dirname(__file__), 'output')
         os.makedirs(self.output_dir, exist_ok=True)
@@ -67,11 +188,11 @@ class EmailProcessor:
             return None
             
         contacts = {
-            'emails': set(),
-            'names': set(),
-            'first_names': set(),
-            'last_names': set(),
-            'organizations': set()
+            'emails': frozenset(),
+            'names': frozenset(),
+            'first_names': frozenset(),
+            'last_names': frozenset(),
+            'organizations': frozenset()
         }
         
         # Try to load from JSON file
@@ -79,13 +200,14 @@ class EmailProcessor:
         if os.path.exists(contacts_file):
             try:
                 self._log(f"\nLoading contacts from {contacts_file}...")
-                with open(contacts_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    contacts['emails'] = set(data.get('emails', []))
-                    contacts['names'] = set(data.get('names', []))
-                    contacts['first_names'] = set(data.get('first_names', []))
-                    contacts['last_names'] = set(data.get('last_names', []))
-                    contacts['organizations'] = set(data.get('organizations', []))
+                data = load_json(contacts_file)
+                # Intern the strings so the sets and the term finder built
+                # from them share a single copy of each value
+                for key in contacts:
+                    contacts[key] = frozenset(
+                        sys.intern(value) if isinstance(value, str) else value
+                        for value in data.get(key, [])
+                    )
                 
                 self._log(f"\nContact loading complete:")
                 self._log(f"- {len(contacts['emails'])} email addresses")
@@ -103,22 +225,72 @@ class EmailProcessor:
         self.contacts = contacts
         return contacts
 
+    def __getstate__(self):
+        # Term finders are closures and cannot be pickled; rebuild them instead
+        state = self.__dict__.copy()
+        del state['_find_text_terms']
+        del state['_find_subject_terms']
+        state['_mail'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._prepare_scoring()
+
+    def _prepare_scoring(self):
+        """Precompute the term finders and weights used for scoring.
+
+        The configuration is fixed for the run, so category presence checks and
+        weight lookups are resolved here once instead of for every email.
+        """
+        config = self.scoring_config
+        
+        if 'billing_addresses' in config:
+            self._billing = (tuple(config['billing_addresses']['addresses']), config['billing_addresses']['score'])
+        else:
+            self._billing = None
+        
+        # (terms, score) for categories checked against subject, sender and body together
+        self._text_categories = [
+            (frozenset(config[category]['terms']), config[category]['score'])
+            for category in ('financial_documents', 'receipts')
+            if category in config
+        ]
+        
+        if self.contacts and 'contact_bonus' in config:
+            self._contact_bonus = config['contact_bonus']
+            organizations = self.contacts['organizations']
+        else:
+            self._contact_bonus = None
+            organizations = frozenset()
+        
+        self._reply_bonus = config['reply_bonus']['is_reply'] if 'reply_bonus' in config else 0
+        
+        self._blacklist_counts = Counter(self.blacklist)
+        all_terms = set(self._blacklist_counts).union(organizations, *(terms for terms, _ in self._text_categories))
+        self._find_text_terms = build_term_finder(list(all_terms))
+        
+        # Important keywords only count when they appear in the subject
+        if 'important_keywords' in config:
+            self._find_subject_terms = build_term_finder(config['important_keywords']['terms'])
+            self._keyword_score = config['important_keywords']['score']
+        else:
+            self._find_subject_terms = None
+
     def _decode_email_header(self, header):
         """Decode email header properly"""
         if not header:
             return ""
+        if isinstance(header, str):
+            # decode_header returns strings without encoded words unchanged
+            if '=?' not in header:
+                return header
+            decode = _decode_encoded_words
+        else:
+            # Header objects are not hashable, so bypass the cache
+            decode = _decode_encoded_words.__wrapped__
         try:
-            decoded_header = decode_header(header)
-            header_parts = []
-            for content, charset in decoded_header:
-                if isinstance(content, bytes):
-                    if charset:
-                        header_parts.append(content.decode(charset))
-                    else:
-                        header_parts.append(content.decode('utf-8', errors='replace'))
-                else:
-                    header_parts.append(content)
-            return ' '.join(header_parts)
+            return decode(header)
         except Exception as e:
             print(f"Error decoding header: {str(e)}")
             return str(header)
@@ -126,122 +298,80 @@ class EmailProcessor:
     def _calculate_importance_score(self, email_data):
         """Calculate importance score for an email using configuration"""
         score = 0
-        text_to_check = f"{email_data['subject']} {email_data['from']} {email_data['body']}".lower()
+        # Lowercase each field once; joining with spaces keeps this identical
+        # to lowercasing the combined string
+        subject_lower = email_data['subject'].lower()
+        text_to_check = f"{subject_lower} {email_data['from'].lower()} {email_data['body'].lower()}"
         
         # Check billing addresses
-        if 'billing_addresses' in self.scoring_config:
+        if self._billing is not None:
             to_addresses = email_data.get('to', '').lower()
-            if any(addr in to_addresses for addr in self.scoring_config['billing_addresses']['addresses']):
-                return self.scoring_config['billing_addresses']['score']
+            addresses, billing_score = self._billing
+            if any(addr in to_addresses for addr in addresses):
+                return billing_score
         
-        # Check financial documents that need attention
-        if 'financial_documents' in self.scoring_config:
-            if any(term in text_to_check for term in self.scoring_config['financial_documents']['terms']):
-                score += self.scoring_config['financial_documents']['score']
+        # Find every configured term in the text with a single scan
+        found = set(self._find_text_terms(text_to_check))
         
-        # Check receipts (negative score)
-        if 'receipts' in self.scoring_config:
-            if any(term in text_to_check for term in self.scoring_config['receipts']['terms']):
-                score += self.scoring_config['receipts']['score']
+        # Check financial documents that need attention, and receipts (negative score)
+        for terms, category_score in self._text_categories:
+            if not found.isdisjoint(terms):
+                score += category_score
         
         # Check important keywords
-        if 'important_keywords' in self.scoring_config:
-            if any(term in email_data['subject'].lower() for term in self.scoring_config['important_keywords']['terms']):
-                score += self.scoring_config['important_keywords']['score']
+        if self._find_subject_terms is not None:
+            if self._find_subject_terms(subject_lower):
+                score += self._keyword_score
         
-        # Check blacklist terms
-        for term in self.blacklist:
-            if term in text_to_check:
-                score -= 2  # Keep blacklist penalty consistent
+        # Check blacklist terms (each listing costs 2)
+        blacklist_counts = self._blacklist_counts
+        for term in found:
+            if term in blacklist_counts:
+                score -= 2 * blacklist_counts[term]  # Keep blacklist penalty consistent
         
         # Check contact bonuses
-        if self.contacts and 'contact_bonus' in self.scoring_config:
+        bonus = self._contact_bonus
+        if bonus is not None:
+            contacts = self.contacts
             if email_data['is_from_contact']:
-                score += self.scoring_config['contact_bonus']['from_contact']
+                score += bonus['from_contact']
             
             # Check name matches
             sender_name = email_data['from'].split('<')[0].strip().lower()
-            if sender_name in self.contacts['names']:
-                score += self.scoring_config['contact_bonus']['full_name_match']
+            if sender_name in contacts['names']:
+                score += bonus['full_name_match']
             else:
                 # Check first and last names
                 name_parts = sender_name.split()
-                if any(part in self.contacts['first_names'] for part in name_parts):
-                    score += self.scoring_config['contact_bonus']['first_name_match']
-                if any(part in self.contacts['last_names'] for part in name_parts):
-                    score += self.scoring_config['contact_bonus']['last_name_match']
+                if not contacts['first_names'].isdisjoint(name_parts):
+                    score += bonus['first_name_match']
+                if not contacts['last_names'].isdisjoint(name_parts):
+                    score += bonus['last_name_match']
             
             # Check organization matches
-            if any(org in text_to_check for org in self.contacts['organizations']):
-                score += self.scoring_config['contact_bonus']['organization_match']
+            if not found.isdisjoint(contacts['organizations']):
+                score += bonus['organization_match']
         
         # Check reply bonus
-        if 'reply_bonus' in self.scoring_config and email_data['is_reply']:
-            score += self.scoring_config['reply_bonus']['is_reply']
+        if self._reply_bonus and email_data['is_reply']:
+            score += self._reply_bonus
         
         return score
 
     def _decode_body(self, part):
         """Decode email body with proper encoding handling"""
         try:
-            # Get the content transfer encoding and charset
-            encoding = part.get('Content-Transfer-Encoding', '').lower()
-            charset = part.get_content_charset() or 'utf-8'
-            
-            # Get the raw payload
+            # Decode the transfer encoding once; multipart containers have no payload
             payload = part.get_payload(decode=True)
             if payload is None:
                 return ""
-
-            # Try to get the decoded content using email library's built-in functions
+            
+            charset = part.get_content_charset() or 'utf-8'
             try:
-                # First try to get the decoded content directly
-                if part.is_multipart():
-                    return ""
-                
-                # Get the content type
-                content_type = part.get_content_type()
-                
-                # Handle different content types
-                if content_type == 'text/plain':
-                    # Try to get the content using get_payload
-                    content = part.get_payload(decode=True)
-                    if content:
-                        # Try different charsets
-                        for test_charset in [charset, 'utf-8', 'latin-1', 'iso-8859-1']:
-                            try:
-                                return content.decode(test_charset, errors='replace')
-                            except Exception:
-                                continue
-                
-                elif content_type == 'text/html':
-                    # For HTML content, try the same approach
-                    content = part.get_payload(decode=True)
-                    if content:
-                        for test_charset in [charset, 'utf-8', 'latin-1', 'iso-8859-1']:
-                            try:
-                                return content.decode(test_charset, errors='replace')
-                            except Exception:
-                                continue
-                
-                # If we get here, try one last time with the original payload
                 return payload.decode(charset, errors='replace')
-                
-            except Exception as e:
-                if self.verbose:
-                    print(f"Error in content decoding: {str(e)}")
-                
-                # Fallback to direct decoding
-                try:
-                    return payload.decode(charset, errors='replace')
-                except Exception:
-                    try:
-                        return payload.decode('utf-8', errors='replace')
-                    except Exception:
-                        try:
-                            return payload.decode('latin-1', errors='replace')
-                        except Exception:
-                            return "Error decoding email body"
+            except (LookupError, UnicodeError):
+                # Unknown or unusable charset label, fall back to utf-8
+                return payload.decode('utf-8', errors='replace')
 
         except Exception as e:
             if self.verbose:
@@ -253,32 +383,50 @@ class EmailProcessor:
         if not text:
             return ""
             
-        # Replace multiple spaces with a single one
-        text = re.sub(r' {2,}', ' ', text)
-        
-        # Remove markdown image syntax
-        text = re.sub(r'!\[.*?\]\(.*?\)', '', text)
+        # Each pass is skipped when the text cannot match it, which is
+        # checked right before the pass so earlier substitutions count
         
-        # Remove markdown links but keep the text
-        text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
+        # Replace multiple spaces with a single one
+        if '  ' in text:
+            text = _MULTI_SPACE_RE.sub(' ', text)
         
-        # Remove horizontal rules
-        text = re.sub(r'-{3,}', '', text)
+        if '](' in text:
+            # Remove markdown image syntax
+            if '![' in text:
+                text = _MD_IMAGE_RE.sub('', text)
+            
+            # Remove markdown links but keep the text
+            text = _MD_LINK_RE.sub(r'\1', text)
         
-        # Remove multiple dashes
-        text = re.sub(r'-{2,}', '-', text)
+        if '--' in text:
+            # Remove horizontal rules
+            text = _HRULE_RE.sub('', text)
+            
+            # Remove multiple dashes
+            text = _MULTI_DASH_RE.sub('-', text)
         
         # Clean up any remaining markdown
-        text = re.sub(r'[*_]{1,2}(.*?)[*_]{1,2}', r'\1', text)
+        if '*' in text or '_' in text:
+            text = _MD_EMPHASIS_RE.sub(r'\1', text)
         
         # Remove any remaining HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
+        if '<' in text:
+            text = _HTML_TAG_RE.sub('', text)
         
         # Remove leading/trailing whitespace
         text = text.strip()
         
         return text
 
+    def _html_to_text(self, html_content):
+        """Convert HTML to cleaned plain text, or return an empty string on failure"""
+        try:
+            return self._clean_text(self.html_converter.handle(html_content))
+        except Exception as e:
+            if self.verbose:
+                print(f"Error converting HTML to plain text: {str(e)}")
+            return ''
+
     def _parse_email(self, email_message):
         """Parse email message into structured data"""
         try:
@@ -346,25 +494,14 @@ class EmailProcessor:
 
             # Process email body and attachments
             if email_message.is_multipart():
+                # (is_plain, part) for each text part, in walk order
+                text_parts = []
                 for part in email_message.walk():
                     content_type = part.get_content_type()
                     if content_type == "text/plain":
-                        # Get plain text content
-                        text_content = self._decode_body(part)
-                        if text_content:
-                            email_data['body'] = self._clean_text(text_content)
+                        text_parts.append((True, part))
                     elif content_type == "text/html":
-                        # Only use HTML content if we don't have plain text
-                        if not email_data['body']:
-                            html_content = self._decode_body(part)
-                            if html_content:
-                                try:
-                                    # Convert HTML to plain text
-                                    text_content = self.html_converter.handle(html_content)
-                                    email_data['body'] = self._clean_text(text_content)
-                                except Exception as e:
-                                    if self.verbose:
-                                        print(f"Error converting HTML to plain text: {str(e)}")
+                        text_parts.append((False, part))
                     elif part.get_content_maintype() == 'application':
                         filename = part.get_filename()
                         if filename:
@@ -373,6 +510,28 @@ class EmailProcessor:
                                 'content_type': content_type,
                                 'size': len(part.get_payload(decode=True) or b'')
                             })
+                
+                # The last plain text part with content always sets the body,
+                # so anything before it never affects the result; find it first
+                # to avoid decoding and converting HTML that would be replaced
+                start = 0
+                for index in range(len(text_parts) - 1, -1, -1):
+                    is_plain, part = text_parts[index]
+                    if is_plain:
+                        text_content = self._decode_body(part)
+                        if text_content:
+                            email_data['body'] = self._clean_text(text_content)
+                            start = index + 1
+                            break
+                
+                # Only use HTML content if we don't have plain text
+                for is_plain, part in text_parts[start:]:
+                    if email_data['body']:
+                        break
+                    if not is_plain:
+                        html_content = self._decode_body(part)
+                        if html_content:
+                            email_data['body'] = self._html_to_text(html_content)
             else:
                 content_type = email_message.get_content_type()
                 if content_type == "text/plain":
@@ -381,12 +540,7 @@ class EmailProcessor:
                 elif content_type == "text/html":
                     html_content = self._decode_body(email_message)
                     if html_content:
-                        try:
-                            text_content = self.html_converter.handle(html_content)
-                            email_data['body'] = self._clean_text(text_content)
-                        except Exception as e:
-                            if self.verbose:
-                                print(f"Error converting HTML to plain text: {str(e)}")
+                        email_data['body'] = self._html_to_text(html_content)
 
             # Calculate importance score
             email_data['importance_score'] = self._calculate_importance_score(email_data)
@@ -397,6 +551,42 @@ class EmailProcessor:
                 print(f"Error parsing email: {str(e)}")
             return None
 
+    def _parse_raw_email(self, item):
+        """Parse one (index, raw bytes) pair, returning (index, email_data, error)"""
+        i, raw = item
+        try:
+            return i, self._parse_email(email.message_from_bytes(raw)), None
+        except Exception as e:
+            return i, None, str(e)
+
+    def _iter_raw_messages(self, mail, email_ids):
+        """Yield (index, raw bytes) for each message, fetching in batches"""
+        # Fetch in batches so each round trip returns many messages;
+        # BODY.PEEK[] leaves the \Seen flag untouched
+        for start in range(0, len(email_ids), FETCH_BATCH_SIZE):
+            batch = email_ids[start:start + FETCH_BATCH_SIZE]
+            try:
+                status, msg_data = mail.fetch(self._optimize_sequence(batch), '(BODY.PEEK[])')
+            except Exception as e:
+                self._log(f"Error fetching emails {start + 1}-{start + len(batch)}: {str(e)}")
+                continue
+            if status != 'OK':
+                self._log(f"Error fetching emails {start + 1}-{start + len(batch)}: {msg_data}")
+                continue
+
+            # Responses may arrive in any order, so key them by sequence number
+            raw_messages = {}
+            for item in msg_data:
+                if isinstance(item, tuple):
+                    raw_messages[item[0].split(None, 1)[0]] = item[1]
+
+            for i, email_id in enumerate(batch, start + 1):
+                raw = raw_messages.get(email_id)
+                if raw is None:
+                    self._log(f"Error fetching email {i}: no data returned")
+                    continue
+                yield i, raw
+
     def _format_imap_date(self, date_str):
         """Convert YYYY-MM-DD to DD-MMM-YYYY format for IMAP"""
         try:
@@ -405,12 +595,48 @@ class EmailProcessor:
         except ValueError:
             raise ValueError("Date must be in YYYY-MM-DD format")
 
+    def _optimize_sequence(self, email_ids):
+        """Compress message ids into an IMAP sequence set like 1:5,7,9:12"""
+        nums = sorted(int(i) for i in email_ids)
+        ranges = []
+        start = prev = nums[0]
+        for n in nums[1:]:
+            if n != prev + 1:
+                ranges.append(f"{start}:{prev}" if start != prev else str(start))
+                start = n
+            prev = n
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+        return ','.join(ranges)
+
+    def _connect(self):
+        """Return the logged-in IMAP connection, opening it on first use"""
+        if self._mail is not None:
+            try:
+                # A NOOP round trip is far cheaper than a new TLS handshake and login
+                self._mail.noop()
+                return self._mail
+            except Exception:
+                self._mail = None
+        
+        self._log(f"\nConnecting to IMAP server {self.imap_server}...")
+        mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
+        mail.login(self.email_address, self.email_password)
+        self._mail = mail
+        return mail
+
+    def close(self):
+        """Log out of the cached IMAP connection, if any"""
+        if self._mail is not None:
+            try:
+                self._mail.logout()
+            except Exception:
+                pass
+            self._mail = None
+
     def list_folders(self):
         """List all available folders on the IMAP server"""
         try:
-            self._log(f"\nConnecting to IMAP server {self.imap_server}...")
-            mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
-            mail.login(self.email_address, self.email_password)
+            mail = self._connect()
             
             # List all folders
             status, folders = mail.list()
@@ -439,27 +665,31 @@ class EmailProcessor:
                 else:
                     self._log(f"Excluding folder: {folder_name}")
             
-            mail.logout()
             return folder_list
         except Exception as e:
             print(f"Error listing folders: {str(e)}")
+            self.close()
             return []
 
     def fetch_emails(self, folder='INBOX', limit=None, since_date=None):
         """Fetch emails from specified folder"""
         try:
-            self._log(f"\nConnecting to IMAP server {self.imap_server}...")
-            # Connect to IMAP server
-            mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
-            mail.login(self.email_address, self.email_password)
+            mail = self._connect()
             
             # Select folder in read-only mode
             self._log(f"Selecting folder: {folder}")
             mail.select(folder, readonly=True)
 
-            # Search for all emails
-            self._log("Searching for all emails...")
-            status, messages = mail.search(None, 'ALL')
+            # Let the server apply the date filter so only matching message
+            # numbers come back
+            search_criteria = 'ALL'
+            if since_date:
+                imap_date = self._format_imap_date(since_date)
+                search_criteria = f'(SINCE "{imap_date}")'
+                self._log(f"Searching for emails since {imap_date}...")
+            else:
+                self._log("Searching for all emails...")
+            status, messages = mail.search(None, search_criteria)
             self._log(f"IMAP Search Status: {status}")
             
             if status != 'OK':
@@ -477,32 +707,35 @@ class EmailProcessor:
                 email_ids = email_ids[-limit:]  # Get the most recent emails
                 self._log(f"Processing {limit} most recent emails")
             
-            for i, email_id in enumerate(email_ids, 1):
-                try:
-                    # Fetch email data
-                    status, msg_data = mail.fetch(email_id, '(RFC822)')
-                    if status != 'OK':
-                        self._log(f"Error fetching email {i}: {msg_data}")
-                        continue
-                    
-                    # Parse email message
-                    email_message = email.message_from_bytes(msg_data[0][1])
-                    email_data = self._parse_email(email_message)
-                    
-                    if email_data:
+            raw_messages = self._iter_raw_messages(mail, email_ids)
+            pool = None
+            if len(email_ids) >= PARALLEL_MIN_EMAILS and (os.cpu_count() or 1) > 1:
+                # imap() pulls the next batches from the server in a feeder
+                # thread while workers parse earlier messages, keeping order
+                pool = multiprocessing.Pool(initializer=init_worker, initargs=(self,))
+                results = pool.imap(_parse_raw_email_worker, raw_messages, chunksize=32)
+            else:
+                results = map(self._parse_raw_email, raw_messages)
+
+            # Leaving the pool's with block terminates it, so an error or
+            # Ctrl-C doesn't wait for the queued work
+            with pool or nullcontext():
+                for i, email_data, error in results:
+                    if error is not None:
+                        self._log(f"Error processing email {i}: {error}")
+                    elif email_data:
                         emails.append(email_data)
                         self._log(f"Processed email {i}/{len(email_ids)}: {email_data['subject']}")
-                    
-                except Exception as e:
-                    self._log(f"Error processing email {i}: {str(e)}")
-                    continue
+                if pool is not None:
+                    pool.close()
+                    pool.join()
             
             mail.close()
-            mail.logout()
             return emails
             
         except Exception as e:
             print(f"Error fetching emails: {str(e)}")
+            self.close()
             return []
 
     def score_emails(self, emails):
@@ -513,29 +746,48 @@ class EmailProcessor:
 
     def generate_summary(self, emails):
         """Generate summary statistics for emails"""
+        from_contacts = replies = with_attachments = total_attachments = 0
+        high = medium = low = 0
+        senders = Counter()
+        
+        # Gather every count in a single pass over the emails
+        for e in emails:
+            if e.get('is_from_contact', False):
+                from_contacts += 1
+            if e.get('is_reply', False):
+                replies += 1
+            attachments = e.get('attachments', [])
+            if attachments:
+                with_attachments += 1
+            total_attachments += len(attachments)
+            score = e.get('importance_score', 0)
+            if score > 5:
+                high += 1
+            elif score >= 0:
+                medium += 1
+            else:
+                low += 1
+            sender = e.get('from', '')
+            if sender:
+                senders[sender] += 1
+        
         summary = {
             'total_emails': len(emails),
-            'from_contacts': sum(1 for e in emails if e.get('is_from_contact', False)),
-            'replies': sum(1 for e in emails if e.get('is_reply', False)),
-            'with_attachments': sum(1 for e in emails if e.get('attachments')),
-            'total_attachments': sum(len(e.get('attachments', [])) for e in emails),
+            'from_contacts': from_contacts,
+            'replies': replies,
+            'with_attachments': with_attachments,
+            'total_attachments': total_attachments,
             'importance_scores': {
-                'high': sum(1 for e in emails if e.get('importance_score', 0) > 5),
-                'medium': sum(1 for e in emails if 0 <= e.get('importance_score', 0) <= 5),
-                'low': sum(1 for e in emails if e.get('importance_score', 0) < 0)
+                'high': high,
+                'medium': medium,
+                'low': low
             },
-            'senders': {},
+            'senders': senders,
             'subjects': []
         }
         
-        # Count senders
-        for email in emails:
-            sender = email.get('from', '')
-            if sender:
-                summary['senders'][sender] = summary['senders'].get(sender, 0) + 1
-        
-        # Get recent subjects
-        recent_emails = sorted(emails, key=lambda x: x.get('date', ''), reverse=True)[:10]
+        # Get recent subjects (same result and tie order as a full reverse sort)
+        recent_emails = heapq.nlargest(10, emails, key=lambda x: x.get('date', ''))
         summary['subjects'] = [e.get('subject', '') for e in recent_emails]
         
         return summary
@@ -551,24 +803,22 @@ class EmailProcessor:
                 existing_emails.append(email)
                 existing_ids.add(email.get('message_id'))
         
-        # Sort by date
+        # Sort by date; keys are all timezone-aware so they can be compared
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        
         def get_date(email):
             try:
                 date_str = email.get('date', '')
                 if not date_str:
-                    return datetime.min
-                try:
-                    return parsedate_to_datetime(date_str)
-                except (TypeError, ValueError):
-                    try:
-                        return datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %z')
-                    except ValueError:
-                        try:
-                            return datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %Z')
-                        except ValueError:
-                            return datetime.min
+                    return oldest
+                date_obj = _parse_date_string(date_str)
+                if date_obj is None:
+                    return oldest
+                if date_obj.tzinfo is None:
+                    date_obj = date_obj.replace(tzinfo=timezone.utc)
+                return date_obj
             except Exception:
-                return datetime.min
+                return oldest
         
         return sorted(existing_emails, key=get_date, reverse=True)
 
@@ -582,10 +832,9 @@ class EmailProcessor:
             existing_emails = []
             if os.path.exists(output_file):
                 try:
-                    with open(output_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        existing_emails = data.get('emails', [])
-                        self._log(f"Loaded {len(existing_emails)} existing emails from {output_file}")
+                    data = load_json(output_file)
+                    existing_emails = data.get('emails', [])
+                    self._log(f"Loaded {len(existing_emails)} existing emails from {output_file}")
                 except Exception as e:
                     self._log(f"Error loading existing file: {str(e)}")
             
@@ -603,16 +852,9 @@ class EmailProcessor:
                 date_str = email.get('date', '')
                 if date_str:
                     try:
-                        try:
-                            date_obj = parsedate_to_datetime(date_str)
-                        except (TypeError, ValueError):
-                            try:
-                                date_obj = datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %z')
-                            except ValueError:
-                                try:
-                                    date_obj = datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %Z')
-                                except ValueError:
-                                    continue
+                        date_obj = _parse_date_string(date_str)
+                        if date_obj is None:
+                            continue
                         # Ensure timezone awareness
                         if date_obj.tzinfo is None:
                             date_obj = date_obj.replace(tzinfo=timezone.utc)
@@ -640,8 +882,7 @@ class EmailProcessor:
             }
             
             # Write to file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, ensure_ascii=False, indent=2)
+            save_json(output_file, output_data)
             
             print(f"\nEmail Processing Summary:")
             print(f"Total Emails in Database: {len(merged_emails)}")
@@ -658,7 +899,7 @@ class EmailProcessor:
             print(f"Oldest: {date_range['oldest']}")
             print(f"Newest: {date_range['newest']}")
             print("\nTop Senders:")
-            for sender, count in sorted(summary['senders'].items(), key=lambda x: x[1], reverse=True)[:5]:
+            for sender, count in summary['senders'].most_common(5):
                 print(f"- {sender}: {count} emails")
             print("\nRecent Subjects:")
             for subject in summary['subjects']:
@@ -673,10 +914,17 @@ class EmailProcessor:
     def count_emails(self, folder='INBOX', since_date=None):
         """Count emails in specified folder without fetching them"""
         try:
-            self._log(f"\nConnecting to IMAP server {self.imap_server}...")
-            # Connect to IMAP server
-            mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
-            mail.login(self.email_address, self.email_password)
+            mail = self._connect()
+            
+            # Without a date filter, STATUS returns the count directly instead
+            # of SEARCH ALL listing every message number
+            if not since_date:
+                self._log(f"Requesting message count for folder: {folder}")
+                status, data = mail.status(folder, '(MESSAGES)')
+                match = _STATUS_MESSAGES_RE.search(data[0]) if status == 'OK' and data and data[0] else None
+                if match:
+                    return int(match.group(1))
+                self._log(f"IMAP STATUS Error: {data}")
             
             # Select folder in read-only mode
             self._log(f"Selecting folder: {folder}")
@@ -697,11 +945,11 @@ class EmailProcessor:
             total_emails = len(email_ids)
             
             mail.close()
-            mail.logout()
             return total_emails
 
         except Exception as e:
             print(f"Error counting emails: {str(e)}")
+            self.close()
             return 0
 
 def main():
@@ -718,6 +966,7 @@ def main():
     parser.add_argument('--list-folders', action='store_true', help='List available folders and exit')
     args = parser.parse_args()
 
+    processor = None
     try:
         processor = EmailProcessor(verbose=args.verbose, load_contacts=not args.no_contacts)
         
@@ -743,28 +992,16 @@ def main():
             folders = [args.folder]
         else:
             # Sort folders alphabetically, but keep INBOX second to last
-            sorted_folders = []
-            inbox_folder = None
-            
-            # First, collect all folders except INBOX
-            for folder in available_folders:
-                if folder == 'INBOX':
-                    inbox_folder = folder
-                else:
-                    sorted_folders.append(folder)
-            
-            # Sort the non-INBOX folders alphabetically
-            sorted_folders.sort()
-            
-            # Add INBOX second to last
-            if inbox_folder:
-                sorted_folders.append(inbox_folder)
+            sorted_folders = sorted(folder for folder in available_folders if folder != 'INBOX')
+            if 'INBOX' in available_folders:
+                sorted_folders.append('INBOX')
+            all_folders_choice = len(sorted_folders) + 1
             
             # Show folder selection menu
             print("\nAvailable folders:")
             for i, folder in enumerate(sorted_folders, 1):
                 print(f"{i}. {folder}")
-            print(f"{len(sorted_folders) + 1}. Process all folders")
+            print(f"{all_folders_choice}. Process all folders")
             
             while True:
                 try:
@@ -773,7 +1010,7 @@ def main():
                         return
                     
                     choice = int(choice)
-                    if choice == len(sorted_folders) + 1:
+                    if choice == all_folders_choice:
                         folders = sorted_folders
                         break
                     elif 1 <= choice <= len(sorted_folders):
@@ -788,9 +1025,8 @@ def main():
             print(f"\nProcessing folder: {folder}")
             if args.input_file:
                 # Load pre-fetched emails from file
-                with open(args.input_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    emails = data.get('emails', [])
+                data = load_json(args.input_file)
+                emails = data.get('emails', [])
             else:
                 # Fetch new emails
                 emails = processor.fetch_emails(folder=folder, limit=args.limit, since_date=args.since)
@@ -808,6 +1044,9 @@ def main():
         print("\nProgram interrupted by user. Exiting...")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        if processor is not None:
+            processor.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,15 +1,76 @@
-import json
 import os
+import io
+import multiprocessing
+from contextlib import nullcontext, redirect_stdout
 from datetime import datetime, timezone
+from json_io import load_json, save_json
 import email.utils
 import re
 
+# Sidecar in the output directory recording the mtime of each fixed file;
+# bump the version when fix_json_file changes what it rewrites
+FIX_CACHE_FILE = '.fix_json_cache.json'
+FIX_CACHE_VERSION = 1
+
 def make_timezone_aware(dt):
     """Convert naive datetime to timezone-aware using UTC"""
     if dt.tzinfo is None:
         return dt.replace(tzinfo=timezone.utc)
     return dt
 
+# Email headers that may wrap a date, tried in order
+_DATE_HEADER_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'Date:\s*(.*?)(?:\r?\n|$)',  # Standard email Date header
+        r'Received:\s*.*?;\s*(.*?)(?:\r?\n|$)',  # Received header
+        r'Delivery-Date:\s*(.*?)(?:\r?\n|$)',  # Delivery-Date header
+    )
+)
+
+_TZ_RE = re.compile(r'([+-]\d{4}|[A-Z]{3,4}|[A-Z]{3,4}\s*\([A-Z]{3,4}\))')
+
+# Common email date formats
+_DATE_FORMATS = (
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%a, %d %b %Y %H:%M:%S %Z',
+    '%a, %d %b %Y %H:%M:%S %z (%Z)',
+    '%a, %d %b %Y %H:%M:%S %z %Z',
+    '%a, %d %b %Y %H:%M:%S %z%Z',
+    '%a, %d %b %Y %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S %z',
+    '%Y-%m-%d %H:%M:%S',
+    '%d %b %Y %H:%M:%S %z',
+    '%d %b %Y %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S',
+    '%d %b %Y %H:%M:%S %z (%Z)',
+    '%d %b %Y %H:%M:%S %Z',
+    '%d %b %Y %H:%M:%S %z',
+    '%d %b %Y %H:%M:%S'
+)
+
+# The formats with their timezone directives removed, which is how they are
+# tried; several collapse to the same string, so duplicates are dropped
+_DATE_FORMATS_NO_TZ = tuple(dict.fromkeys(
+    fmt.replace(' %z', '').replace(' %Z', '') for fmt in _DATE_FORMATS
+))
+
+# Formats starting with a weekday name can only match text starting with a
+# letter, and the others only text starting with a digit
+_WEEKDAY_FORMATS = tuple(fmt for fmt in _DATE_FORMATS_NO_TZ if fmt.startswith('%a'))
+_NUMERIC_FORMATS = tuple(fmt for fmt in _DATE_FORMATS_NO_TZ if not fmt.startswith('%a'))
+
+def _candidate_formats(value):
+    """Return the strptime formats that could match value"""
+    first = value[:1]
+    if first.isalpha():
+        return _WEEKDAY_FORMATS
+    if first.isdigit():
+        return _NUMERIC_FORMATS
+    return ()
+
 def parse_date(date_str):
     """Parse date string in various formats"""
     if not date_str or date_str == 'None' or date_str == 'null':
@@ -18,18 +79,27 @@ def parse_date(date_str):
     # Clean up the date string
     date_str = date_str.strip()
     
-    # Try to extract date from common email header formats
-    date_patterns = [
-        r'Date:\s*(.*?)(?:\r?\n|$)',  # Standard email Date header
-        r'Received:\s*.*?;\s*(.*?)(?:\r?\n|$)',  # Received header
-        r'Delivery-Date:\s*(.*?)(?:\r?\n|$)',  # Delivery-Date header
-    ]
+    # Each header pattern needs its header name, which always ends in
+    # "date:" or "received:", so most strings can skip the searches
+    lowered = date_str.lower()
+    has_header = 'date:' in lowered or 'received:' in lowered
+    
+    # Stored dates are mostly ISO 8601 already. RFC 2822 parsing needs a month
+    # name, which ISO dates never contain, so trying ISO first cannot change
+    # the result
+    if not has_header and date_str[:4].isdigit() and date_str[4:5] == '-':
+        try:
+            return make_timezone_aware(datetime.fromisoformat(date_str.replace('Z', '+00:00')))
+        except ValueError:
+            pass
     
-    for pattern in date_patterns:
-        match = re.search(pattern, date_str, re.IGNORECASE)
-        if match:
-            date_str = match.group(1).strip()
-            break
+    # Try to extract date from common email header formats
+    if has_header:
+        for pattern in _DATE_HEADER_PATTERNS:
+            match = pattern.search(date_str)
+            if match:
+                date_str = match.group(1).strip()
+                break
     
     try:
         # Try RFC 2822 format first
@@ -42,37 +112,15 @@ def parse_date(date_str):
             return make_timezone_aware(dt)
         except (ValueError, AttributeError):
             try:
-                # Try common email date formats
-                formats = [
-                    '%a, %d %b %Y %H:%M:%S %z',
-                    '%a, %d %b %Y %H:%M:%S %Z',
-                    '%a, %d %b %Y %H:%M:%S %z (%Z)',
-                    '%a, %d %b %Y %H:%M:%S %z %Z',
-                    '%a, %d %b %Y %H:%M:%S %z%Z',
-                    '%a, %d %b %Y %H:%M:%S',
-                    '%Y-%m-%d %H:%M:%S %z',
-                    '%Y-%m-%d %H:%M:%S',
-                    '%d %b %Y %H:%M:%S %z',
-                    '%d %b %Y %H:%M:%S',
-                    '%Y-%m-%dT%H:%M:%S.%f%z',
-                    '%Y-%m-%dT%H:%M:%S%z',
-                    '%Y-%m-%dT%H:%M:%S.%f',
-                    '%Y-%m-%dT%H:%M:%S',
-                    '%d %b %Y %H:%M:%S %z (%Z)',
-                    '%d %b %Y %H:%M:%S %Z',
-                    '%d %b %Y %H:%M:%S %z',
-                    '%d %b %Y %H:%M:%S'
-                ]
-                
                 # Try to extract timezone if present
-                tz_match = re.search(r'([+-]\d{4}|[A-Z]{3,4}|[A-Z]{3,4}\s*\([A-Z]{3,4}\))', date_str)
+                tz_match = _TZ_RE.search(date_str)
                 if tz_match:
                     tz = tz_match.group(1)
                     # Remove timezone for initial parsing
                     date_str_no_tz = date_str.replace(tz, '').strip()
-                    for fmt in formats:
+                    for fmt in _candidate_formats(date_str_no_tz):
                         try:
-                            dt = datetime.strptime(date_str_no_tz, fmt.replace(' %z', '').replace(' %Z', ''))
+                            dt = datetime.strptime(date_str_no_tz, fmt)
                             # Add timezone back
                             if tz.startswith('+') or tz.startswith('-'):
                                 dt = dt.replace(tzinfo=datetime.strptime(tz, '%z').tzinfo)
@@ -81,9 +129,9 @@ def parse_date(date_str):
                             continue
                 else:
                     # Try without timezone
-                    for fmt in formats:
+                    for fmt in _candidate_formats(date_str):
                         try:
-                            dt = datetime.strptime(date_str, fmt.replace(' %z', '').replace(' %Z', ''))
+                            dt = datetime.strptime(date_str, fmt)
                             return make_timezone_aware(dt)
                         except ValueError:
                             continue
@@ -92,13 +140,12 @@ def parse_date(date_str):
     return None
 
 def fix_json_file(file_path):
-    """Fix line terminators and date formatting in a JSON file"""
+    """Fix line terminators and date formatting in a JSON file; return True on success"""
     print(f"\nProcessing {file_path}...")
     
     try:
         # Read the existing file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(file_path)
         
         # Special handling for contacts.json
         if os.path.basename(file_path) == 'contacts.json':
@@ -109,52 +156,54 @@ def fix_json_file(file_path):
                     data[field] = []
             
             # Save with fixed structure
-            with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            save_json(file_path, data)
             
             print(f"Successfully fixed {file_path}")
-            return
-        
-        # Fix line terminators in email bodies
-        for email in data.get('emails', []):
-            if 'body' in email:
-                email['body'] = email['body'].replace('\r\n', '\n').replace('\r', '\n')
+            return True
         
         # Fix date range in summary
         summary = data.get('summary', {})
         date_range = summary.get('date_range', {})
         
-        # Recalculate date range
-        valid_dates = []
+        # Recalculate date range; parse_date always returns aware datetimes,
+        # so the range is tracked as the emails are fixed
+        oldest = newest = None
         invalid_dates = []
         
+        # Fix line terminators and dates in one pass over the emails
         for email in data.get('emails', []):
+            if 'body' in email:
+                body = email['body']
+                if '\r' in body:
+                    email['body'] = body.replace('\r\n', '\n').replace('\r', '\n')
+            
             date_str = email.get('date', '')
             if date_str:
                 date_obj = parse_date(date_str)
-                if date_obj:
-                    valid_dates.append(date_obj)
-                    # Update the email's date to ISO format
-                    email['date'] = date_obj.isoformat()
-                else:
+                if not date_obj:
                     # Try to get date from headers if available
                     headers = email.get('headers', {})
                     for header in ['date', 'received', 'delivery-date']:
                         if header in headers:
                             date_obj = parse_date(headers[header])
                             if date_obj:
-                                valid_dates.append(date_obj)
-                                email['date'] = date_obj.isoformat()
                                 break
                     else:
                         invalid_dates.append((email.get('message_id', 'unknown'), date_str))
+                        continue
+                
+                # Update the email's date to ISO format
+                email['date'] = date_obj.isoformat()
+                # Strict comparisons keep the first of equal instants, like min/max
+                if oldest is None or date_obj < oldest:
+                    oldest = date_obj
+                if newest is None or date_obj > newest:
+                    newest = date_obj
         
-        if valid_dates:
-            # Ensure all dates are timezone-aware before comparison
-            valid_dates = [make_timezone_aware(dt) for dt in valid_dates]
+        if oldest is not None:
             date_range = {
-                'oldest': min(valid_dates).isoformat(),
-                'newest': max(valid_dates).isoformat()
+                'oldest': oldest.isoformat(),
+                'newest': newest.isoformat()
             }
             summary['date_range'] = date_range
             data['summary'] = summary
@@ -170,25 +219,77 @@ def fix_json_file(file_path):
             print(f"Warning: No valid dates found in {file_path}")
         
         # Save with fixed line endings
-        with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        save_json(file_path, data)
         
         print(f"Successfully fixed {file_path}")
-        if valid_dates:
+        if oldest is not None:
             print(f"Date range: {date_range['oldest']} to {date_range['newest']}")
+        return True
         
     except Exception as e:
         print(f"Error processing {file_path}: {str(e)}")
+        return False
+
+def _fix_json_file_captured(file_path):
+    """Run fix_json_file in a worker process and return its result and what it printed"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        fixed = fix_json_file(file_path)
+    return fixed, output.getvalue()
+
+def load_fix_cache(cache_file):
+    """Load the file -> mtime map of files fixed by earlier runs"""
+    try:
+        cache = load_json(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != FIX_CACHE_VERSION:
+        return {}
+    return cache.get('files', {})
 
 def main():
     # Get the output directory
     output_dir = os.path.join(os.path.dirname(__file__), 'output')
     
+    # Files whose modification time matches the one recorded after they were
+    # last fixed are unchanged since then, so fixing them again is a no-op
+    cache_file = os.path.join(output_dir, FIX_CACHE_FILE)
+    cache = load_fix_cache(cache_file)
+    
     # Process all JSON files in the output directory
-    for filename in os.listdir(output_dir):
-        if filename.endswith('.json'):
-            file_path = os.path.join(output_dir, filename)
-            fix_json_file(file_path)
+    file_paths = []
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json') or entry.name == FIX_CACHE_FILE:
+                continue
+            if cache.get(entry.name) == entry.stat().st_mtime_ns:
+                print(f"\nSkipping {entry.path} (unchanged since it was last fixed)")
+                continue
+            file_paths.append(entry.path)
+    
+    processes = min(os.cpu_count() or 1, len(file_paths))
+    if processes < 2:
+        results = ((fix_json_file(file_path), None) for file_path in file_paths)
+        pool = None
+    else:
+        # Files are independent, so fix them in parallel; each worker's output
+        # is printed as a block, in the same order as the sequential loop
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap(_fix_json_file_captured, file_paths)
+    
+    with pool or nullcontext():
+        for file_path, (fixed, output) in zip(file_paths, results):
+            if output is not None:
+                print(output, end='')
+            if fixed:
+                cache[os.path.basename(file_path)] = os.stat(file_path).st_mtime_ns
+            else:
+                cache.pop(os.path.basename(file_path), None)
+        if pool is not None:
+            pool.close()
+            pool.join()
+    
+    save_json(cache_file, {'version': FIX_CACHE_VERSION, 'files': cache})
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,89 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+else:
+    # The pure-Python backend is many times slower than json.loads
+    if ijson.backend not in ('yajl2_c', 'yajl2_cffi'):
+        ijson = None
+
+def load_json(file_path, key=None):
+    """Load a JSON file, or only the list under its top-level key if one is given"""
+    data = None
+    if orjson is None and ujson is None and ijson is not None:
+        # Streaming builds nothing outside the key, and on files with large
+        # bodies avoids holding the raw text alongside the parsed objects; on
+        # small records it is slower than json.loads and uses more memory
+        prefix = '' if key is None else key + '.item'
+        try:
+            with open(file_path, 'rb') as f:
+                values = list(ijson.items(f, prefix, use_float=True))
+        except ijson.JSONError:
+            values = None
+        if values is not None:
+            if key is not None:
+                return values
+            if len(values) == 1:
+                return values[0]
+
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    if orjson is not None:
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    elif ujson is not None:
+        try:
+            data = ujson.loads(raw)
+        except ValueError:
+            pass
+    if data is None:
+        # Parsers that failed above fall through to json, so errors are always
+        # reported by json, which also accepts input orjson rejects (such as NaN)
+        data = json.loads(raw.decode('utf-8'))
+    return data if key is None else data.get(key, [])
+
+def save_json(file_path, data):
+    """Write data as indented JSON, replacing file_path only once it is fully written"""
+    # orjson produces the same layout as the json.dump call below, though
+    # floats in exponent form are spelled differently (1e-05 becomes 0.00001).
+    # Datetimes are passed through so they fail in json.dump as before
+    serialized = None
+    if orjson is not None:
+        try:
+            serialized = orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            # e.g. lone surrogates in a decoded body, which json accepts
+            serialized = None
+
+    # Write next to the target and rename over it, so an interrupted run
+    # leaves the previous file intact
+    tmp_path = file_path + '.tmp'
+    try:
+        if serialized is not None:
+            with open(tmp_path, 'wb') as f:
+                f.write(serialized)
+        else:
+            with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -3,6 +3,8 @@ import json
 import os
 from email_validator import validate_email, EmailNotValidError
 
+EMAIL_FIELDS = ('E-mail 1 - Value', 'E-mail 2 - Value', 'E-mail 3 - Value')
+
 def parse_contacts():
     # Define possible locations for contacts.csv
     possible_locations = [
@@ -24,14 +26,16 @@ def parse_contacts():
     
     print(f"Found contacts file at: {contacts_file}")
     
-    # Initialize contacts data structure
-    contacts = {
-        'emails': set(),
-        'names': set(),
-        'first_names': set(),
-        'last_names': set(),
-        'organizations': set()
-    }
+    # Initialize contacts data structure; the name and organization sets are
+    # built from these raw column values once the file is read
+    contacts = {'emails': set()}
+    first_values = []
+    last_values = []
+    organization_values = []
+    
+    # Normalized address (or None if invalid) per raw value; validation can
+    # involve DNS lookups, so each distinct address is only checked once
+    validated = {}
     
     try:
         print("Parsing contacts...")
@@ -44,42 +48,45 @@ def parse_contacts():
                     print(f"Processed {row_count} contacts...")
                 
                 # Process email addresses
-                email_fields = ['E-mail 1 - Value', 'E-mail 2 - Value', 'E-mail 3 - Value']
-                for field in email_fields:
+                for field in EMAIL_FIELDS:
                     if field in row and row[field]:
-                        try:
-                            email = validate_email(row[field].strip()).email
-                            contacts['emails'].add(email)
-                        except EmailNotValidError:
-                            continue
-                
-                # Process names and organization
-                if 'First Name' in row and row['First Name']:
-                    first_name = row['First Name'].strip().lower()
-                    contacts['first_names'].add(first_name)
-                    contacts['names'].add(first_name)
+                        raw_email = row[field].strip()
+                        if raw_email not in validated:
+                            try:
+                                validated[raw_email] = validate_email(raw_email).email
+                            except EmailNotValidError:
+                                validated[raw_email] = None
+                        if validated[raw_email] is not None:
+                            contacts['emails'].add(validated[raw_email])
                 
-                if 'Last Name' in row and row['Last Name']:
-                    last_name = row['Last Name'].strip().lower()
-                    contacts['last_names'].add(last_name)
-                    contacts['names'].add(last_name)
-                    
-                    # Add full name if both first and last names exist
-                    if 'First Name' in row and row['First Name']:
-                        full_name = f"{row['First Name'].strip().lower()} {last_name}"
-                        contacts['names'].add(full_name)
-                
-                if 'Organization Name' in row and row['Organization Name']:
-                    org = row['Organization Name'].strip().lower()
-                    contacts['organizations'].add(org)
+                # Collect names and organization
+                first_values.append(row.get('First Name'))
+                last_values.append(row.get('Last Name'))
+                organization_values.append(row.get('Organization Name'))
+        
+        # Exports repeat the same names and organizations across many rows,
+        # so each distinct value is normalized once
+        first_names = {value: value.strip().lower() for value in set(first_values) if value}
+        last_names = {value: value.strip().lower() for value in set(last_values) if value}
+        contacts['first_names'] = set(first_names.values())
+        contacts['last_names'] = set(last_names.values())
+        contacts['organizations'] = {value.strip().lower() for value in set(organization_values) if value}
+        
+        # Names include the full name of every row with both first and last names
+        contacts['names'] = contacts['first_names'] | contacts['last_names']
+        contacts['names'].update(
+            f"{first_names[first]} {last_names[last]}"
+            for first, last in set(zip(first_values, last_values))
+            if first and last
+        )
         
         # Convert sets to lists for JSON serialization
         contacts_json = {
-            'emails': sorted(list(contacts['emails'])),
-            'names': sorted(list(contacts['names'])),
-            'first_names': sorted(list(contacts['first_names'])),
-            'last_names': sorted(list(contacts['last_names'])),
-            'organizations': sorted(list(contacts['organizations'])),
+            'emails': sorted(contacts['emails']),
+            'names': sorted(contacts['names']),
+            'first_names': sorted(contacts['first_names']),
+            'last_names': sorted(contacts['last_names']),
+            'organizations': sorted(contacts['organizations']),
             'last_updated': None  # Will be set by update_contacts.py
         }
         
@@ -1,5 +1,5 @@
 import os
-from email_processor import EmailProcessor
+from email_processor import EmailProcessor, build_term_finder
 
 def test_blacklist():
     # Initialize processor with verbose mode
@@ -47,6 +47,9 @@ def test_blacklist():
         }
     ]
     
+    # Scans each text once, returning terms in blacklist order like the per-term check
+    find_blacklist_terms = build_term_finder(processor.blacklist)
+    
     print("\nTesting blacklist scoring:")
     for email in test_emails:
         score = processor._calculate_importance_score(email)
@@ -57,7 +60,7 @@ def test_blacklist():
         
         # Check if any blacklisted terms are present
         text_to_check = f"{email['subject']} {email['from']} {email['body']}".lower()
-        found_terms = [term for term in processor.blacklist if term in text_to_check]
+        found_terms = find_blacklist_terms(text_to_check)
         if found_terms:
             print("Found blacklisted terms:")
             for term in found_terms:
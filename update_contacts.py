@@ -1,8 +1,25 @@
 import csv
-import json
 import os
 from datetime import datetime
-from email_validator import validate_email, EmailNotValidError
+from json_io import load_json, save_json
+
+EMAIL_FIELDS = ('E-mail 1 - Value', 'E-mail 2 - Value', 'E-mail 3 - Value')
+
+def _field(row, column):
+    """Return a csv.reader row's value in column, or '' if the column or value is missing"""
+    if column is None or column >= len(row):
+        return ''
+    return row[column]
+
+def _diff_counts(new, existing):
+    """Count the items added to and removed from existing to get new"""
+    # Whatever in new was not added is shared with existing, so only one
+    # set difference has to be built
+    added = len(new - existing)
+    return {
+        'added': added,
+        'removed': len(existing) - (len(new) - added)
+    }
 
 def update_contacts():
     # Load existing contacts
@@ -12,8 +29,7 @@ def update_contacts():
         return
     
     try:
-        with open(contacts_file, 'r', encoding='utf-8') as f:
-            existing_contacts = json.load(f)
+        existing_contacts = load_json(contacts_file)
     except Exception as e:
         print(f"Error loading existing contacts: {str(e)}")
         return
@@ -47,91 +63,88 @@ def update_contacts():
     
     print(f"Found contacts file at: {csv_file}")
     
-    # Initialize new contacts data structure
-    new_contacts = {
-        'emails': set(),
-        'names': set(),
-        'first_names': set(),
-        'last_names': set(),
-        'organizations': set()
-    }
+    # Imported here as it is slow to load and only needed once there is a
+    # file to parse
+    from email_validator import validate_email, EmailNotValidError
+    
+    # Initialize new contacts data structure; the sets are built from these
+    # raw column values once the file is read
+    new_contacts = {'emails': set()}
+    raw_emails = set()
+    first_values = []
+    last_values = []
+    organization_values = []
     
     try:
         print("Parsing new contacts...")
         with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+            # Plain rows with column positions looked up once from the header,
+            # instead of a dict per row; like DictReader, a repeated column
+            # name refers to its last occurrence
+            reader = csv.reader(f)
+            columns = {name: i for i, name in enumerate(next(reader, []))}
+            email_columns = [columns[field] for field in EMAIL_FIELDS if field in columns]
+            first_name_column = columns.get('First Name')
+            last_name_column = columns.get('Last Name')
+            organization_column = columns.get('Organization Name')
+            
             row_count = 0
             for row in reader:
+                if not row:
+                    continue  # Blank line, which DictReader skips as well
                 row_count += 1
                 if row_count % 100 == 0:
                     print(f"Processed {row_count} contacts...")
                 
-                # Process email addresses
-                email_fields = ['E-mail 1 - Value', 'E-mail 2 - Value', 'E-mail 3 - Value']
-                for field in email_fields:
-                    if field in row and row[field]:
-                        try:
-                            email = validate_email(row[field].strip()).email
-                            new_contacts['emails'].add(email)
-                        except EmailNotValidError:
-                            continue
-                
-                # Process names and organization
-                if 'First Name' in row and row['First Name']:
-                    first_name = row['First Name'].strip().lower()
-                    new_contacts['first_names'].add(first_name)
-                    new_contacts['names'].add(first_name)
-                
-                if 'Last Name' in row and row['Last Name']:
-                    last_name = row['Last Name'].strip().lower()
-                    new_contacts['last_names'].add(last_name)
-                    new_contacts['names'].add(last_name)
-                    
-                    # Add full name if both first and last names exist
-                    if 'First Name' in row and row['First Name']:
-                        full_name = f"{row['First Name'].strip().lower()} {last_name}"
-                        new_contacts['names'].add(full_name)
-                
-                if 'Organization Name' in row and row['Organization Name']:
-                    org = row['Organization Name'].strip().lower()
-                    new_contacts['organizations'].add(org)
+                # Collect email addresses, names and organization
+                for column in email_columns:
+                    value = _field(row, column)
+                    if value:
+                        raw_emails.add(value.strip())
+                first_values.append(_field(row, first_name_column))
+                last_values.append(_field(row, last_name_column))
+                organization_values.append(_field(row, organization_column))
+        
+        # Validate each distinct address once; validation can involve DNS lookups
+        for raw_email in raw_emails:
+            try:
+                new_contacts['emails'].add(validate_email(raw_email).email)
+            except EmailNotValidError:
+                continue
+        
+        # Exports repeat the same names and organizations across many rows,
+        # so each distinct value is normalized once
+        first_names = {value: value.strip().lower() for value in set(first_values) if value}
+        last_names = {value: value.strip().lower() for value in set(last_values) if value}
+        new_contacts['first_names'] = set(first_names.values())
+        new_contacts['last_names'] = set(last_names.values())
+        new_contacts['organizations'] = {value.strip().lower() for value in set(organization_values) if value}
+        
+        # Names include the full name of every row with both first and last names
+        new_contacts['names'] = new_contacts['first_names'] | new_contacts['last_names']
+        new_contacts['names'].update(
+            f"{first_names[first]} {last_names[last]}"
+            for first, last in set(zip(first_values, last_values))
+            if first and last
+        )
         
         # Calculate changes
         changes = {
-            'emails': {
-                'added': len(new_contacts['emails'] - existing_contacts['emails']),
-                'removed': len(existing_contacts['emails'] - new_contacts['emails'])
-            },
-            'names': {
-                'added': len(new_contacts['names'] - existing_contacts['names']),
-                'removed': len(existing_contacts['names'] - new_contacts['names'])
-            },
-            'first_names': {
-                'added': len(new_contacts['first_names'] - existing_contacts['first_names']),
-                'removed': len(existing_contacts['first_names'] - new_contacts['first_names'])
-            },
-            'last_names': {
-                'added': len(new_contacts['last_names'] - existing_contacts['last_names']),
-                'removed': len(existing_contacts['last_names'] - new_contacts['last_names'])
-            },
-            'organizations': {
-                'added': len(new_contacts['organizations'] - existing_contacts['organizations']),
-                'removed': len(existing_contacts['organizations'] - new_contacts['organizations'])
-            }
+            category: _diff_counts(new_contacts[category], existing_contacts[category])
+            for category in existing_contacts
         }
         
         # Save updated contacts
         contacts_json = {
-            'emails': sorted(list(new_contacts['emails'])),
-            'names': sorted(list(new_contacts['names'])),
-            'first_names': sorted(list(new_contacts['first_names'])),
-            'last_names': sorted(list(new_contacts['last_names'])),
-            'organizations': sorted(list(new_contacts['organizations'])),
+            'emails': sorted(new_contacts['emails']),
+            'names': sorted(new_contacts['names']),
+            'first_names': sorted(new_contacts['first_names']),
+            'last_names': sorted(new_contacts['last_names']),
+            'organizations': sorted(new_contacts['organizations']),
             'last_updated': datetime.now().isoformat()
         }
         
-        with open(contacts_file, 'w', encoding='utf-8') as f:
-            json.dump(contacts_json, f, ensure_ascii=False, indent=2)
+        save_json(contacts_file, contacts_json)
         
         # Print summary of changes
         print("\nContact Update Summary:")
@@ -1,67 +1,74 @@
-import json
 import os
-from email_processor import EmailProcessor
-from collections import defaultdict
+import io
+import multiprocessing
+from contextlib import nullcontext, redirect_stdout
+from json_io import load_json, save_json
+from collections import Counter
 
 def get_available_files():
     """Get list of available email JSON files"""
     output_dir = 'output'
-    json_files = [f for f in os.listdir(output_dir) if f.endswith('_raw_emails.json')]
-    return sorted(json_files)
+    with os.scandir(output_dir) as entries:
+        return sorted(entry.name for entry in entries if entry.name.endswith('_raw_emails.json'))
+
+def _process_file_captured(file_path):
+    """Run process_file with the worker's processor and return its stats and what it printed"""
+    # Already imported in the worker when its processor was unpickled
+    import email_processor
+    output = io.StringIO()
+    with redirect_stdout(output):
+        stats = process_file(email_processor.worker_processor, file_path)
+    return stats, output.getvalue()
+
+def _process_files(processor, selected_files):
+    """Score the files in this process, printing each header before its file is scored"""
+    for file_name in selected_files:
+        print(f"\nProcessing {file_name}...")
+        yield process_file(processor, os.path.join('output', file_name)), None
 
 def process_file(processor, file_path):
     """Process a single file and return statistics about score changes"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            emails = data.get('emails', [])
+        data = load_json(file_path)
+        emails = data.get('emails', [])
         
         if not emails:
             return None
             
-        # Store original scores
+        # Store original scores, and each email's stored score in order to
+        # tell whether anything needs writing back
         original_scores = {email['message_id']: email.get('importance_score', 0) for email in emails}
+        stored_scores = [email.get('importance_score') for email in emails]
         
         # Update scores
         updated_emails = processor.score_emails(emails)
         
+        # Gather the new scores and score changes, then reduce each with a
+        # builtin instead of updating every statistic per email
+        new_scores = [email['importance_score'] for email in updated_emails]
+        score_changes = [
+            new_score - original_scores[email['message_id']]
+            for email, new_score in zip(updated_emails, new_scores)
+        ]
+        high_importance = sum(score >= 3 for score in new_scores)
+        medium_importance = sum(score >= 1 for score in new_scores) - high_importance
+        
         # Calculate statistics
         stats = {
             'total_emails': len(emails),
-            'score_changes': defaultdict(int),  # Count of emails by score change
-            'high_importance': 0,  # Count of high importance emails (score >= 3)
-            'medium_importance': 0,  # Count of medium importance emails (1 <= score < 3)
-            'low_importance': 0,  # Count of low importance emails (score < 1)
-            'max_increase': 0,
-            'max_decrease': 0,
-            'total_change': 0
+            'score_changes': Counter(score_changes),  # Count of emails by score change
+            'high_importance': high_importance,  # Count of high importance emails (score >= 3)
+            'medium_importance': medium_importance,  # Count of medium importance emails (1 <= score < 3)
+            'low_importance': len(new_scores) - high_importance - medium_importance,  # Count of low importance emails (score < 1)
+            'max_increase': max(0, max(score_changes)),
+            'max_decrease': min(0, min(score_changes)),
+            'total_change': sum(score_changes)
         }
         
-        for email in updated_emails:
-            old_score = original_scores[email['message_id']]
-            new_score = email['importance_score']
-            score_change = new_score - old_score
-            
-            # Track score changes
-            stats['score_changes'][score_change] += 1
-            stats['total_change'] += score_change
-            
-            # Track max changes
-            stats['max_increase'] = max(stats['max_increase'], score_change)
-            stats['max_decrease'] = min(stats['max_decrease'], score_change)
-            
-            # Track importance levels
-            if new_score >= 3:
-                stats['high_importance'] += 1
-            elif new_score >= 1:
-                stats['medium_importance'] += 1
-            else:
-                stats['low_importance'] += 1
-        
-        # Save updated file
-        data['emails'] = updated_emails
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Save updated file, unless every email kept the score it already had
+        if new_scores != stored_scores:
+            data['emails'] = updated_emails
+            save_json(file_path, data)
         
         return stats
         
@@ -70,9 +77,6 @@ def process_file(processor, file_path):
         return None
 
 def main():
-    # Initialize processor
-    processor = EmailProcessor(verbose=True)
-    
     # Get available files
     json_files = get_available_files()
     
@@ -80,6 +84,11 @@ def main():
         print("No email files found in output directory!")
         return
     
+    # Initialize processor; email_processor is slow to import and the
+    # processor loads contacts, so both wait until there are files to score
+    from email_processor import EmailProcessor, init_worker
+    processor = EmailProcessor(verbose=True)
+    
     # Display available files
     print("\nAvailable files:")
     for i, file_name in enumerate(json_files, 1):
@@ -109,7 +118,7 @@ def main():
     all_stats = {}
     total_stats = {
         'total_emails': 0,
-        'score_changes': defaultdict(int),
+        'score_changes': Counter(),
         'high_importance': 0,
         'medium_importance': 0,
         'low_importance': 0,
@@ -119,26 +128,40 @@ def main():
     }
     
     print("\nProcessing files...")
-    for file_name in selected_files:
-        file_path = os.path.join('output', file_name)
-        print(f"\nProcessing {file_name}...")
-        
-        stats = process_file(processor, file_path)
-        if stats:
-            all_stats[file_name] = stats
-            
-            # Update total statistics
-            total_stats['total_emails'] += stats['total_emails']
-            total_stats['high_importance'] += stats['high_importance']
-            total_stats['medium_importance'] += stats['medium_importance']
-            total_stats['low_importance'] += stats['low_importance']
-            total_stats['max_increase'] = max(total_stats['max_increase'], stats['max_increase'])
-            total_stats['max_decrease'] = min(total_stats['max_decrease'], stats['max_decrease'])
-            total_stats['total_change'] += stats['total_change']
-            
-            # Merge score changes
-            for change, count in stats['score_changes'].items():
-                total_stats['score_changes'][change] += count
+    file_paths = [os.path.join('output', file_name) for file_name in selected_files]
+    processes = min(os.cpu_count() or 1, len(file_paths))
+    if processes < 2:
+        # Print as each file is scored, so a large file shows its progress
+        results = _process_files(processor, selected_files)
+        pool = None
+    else:
+        # Files are independent, so score them in parallel; each file's
+        # output is printed as a block, in the order the files were selected
+        pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(processor,))
+        results = pool.imap(_process_file_captured, file_paths)
+    
+    with pool or nullcontext():
+        for file_name, (stats, output) in zip(selected_files, results):
+            if output is not None:
+                print(f"\nProcessing {file_name}...")
+                print(output, end='')
+            if stats:
+                all_stats[file_name] = stats
+                
+                # Update total statistics
+                total_stats['total_emails'] += stats['total_emails']
+                total_stats['high_importance'] += stats['high_importance']
+                total_stats['medium_importance'] += stats['medium_importance']
+                total_stats['low_importance'] += stats['low_importance']
+                total_stats['max_increase'] = max(total_stats['max_increase'], stats['max_increase'])
+                total_stats['max_decrease'] = min(total_stats['max_decrease'], stats['max_decrease'])
+                total_stats['total_change'] += stats['total_change']
+                
+                # Merge score changes
+                total_stats['score_changes'].update(stats['score_changes'])
+        if pool is not None:
+            pool.close()
+            pool.join()
     
     # Print detailed summary
     print("\n" + "="*80)